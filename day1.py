@@ -1,4 +1,12 @@
 from pytest import fixture
+from typing import Iterable, Union
+from collections import deque
+from itertools import islice
+import os
+import sys
+import tempfile
+import time
+import numpy as np
 
 
 @fixture
@@ -11,13 +19,71 @@ def read(filename: str) -> list:
         return [int(line) for line in f]
 
 
+def parse_array(buf: np.ndarray, dtype=np.int64) -> np.ndarray:
+    # Decode newline separated integers from raw bytes; numpy parses the text in C
+    # so no per-line Python ints are created.
+    return np.fromstring(buf.tobytes(), dtype=dtype, sep='\n')
+
+
+def test_parse_array(sample):
+    buf = np.frombuffer(b'199\n200\r\n8\n\n1000', dtype=np.uint8)
+    assert parse_array(buf).tolist() == [199, 200, 8, 1000]
+    buf = np.frombuffer(''.join(f'{v}\n' for v in sample).encode(), dtype=np.uint8)
+    assert parse_array(buf, np.int32).tolist() == sample
+
+
+def read_array(filename: str, dtype=np.int64, chunk_size: int = 1 << 24) -> np.ndarray:
+    # Memory-map the file and parse it chunk by chunk, cutting every chunk after a newline.
+    if os.path.getsize(filename) == 0:
+        return np.zeros(0, dtype=dtype)
+    data = np.memmap(filename, dtype=np.uint8, mode='r')
+    parts = []
+    start = 0
+    while start < data.size:
+        end = min(start + chunk_size, data.size)
+        while end < data.size and data[end - 1] != ord('\n'):
+            newlines = np.flatnonzero(data[start:end] == ord('\n'))
+            if newlines.size:
+                end = start + newlines[-1] + 1
+            else:
+                end = min(end + chunk_size, data.size)
+        parts.append(parse_array(data[start:end], dtype))
+        start = end
+    return np.concatenate(parts)
+
+
+def test_read_array(sample, tmp_path):
+    filename = tmp_path / 'input'
+    filename.write_text(''.join(f'{v}\n' for v in sample))
+    assert read_array(str(filename), chunk_size=5).tolist() == sample
+    assert read_array(str(filename)).tolist() == read(str(filename))
+
+
+def count_increases(measurements: Iterable[Union[int, str]], window: int = 1) -> int:
+    # Count how many times the sum of a sliding window increases.
+    # Consecutive window sums differ by x[i+k] - x[i], so only the last k values are kept.
+    # Accepts any iterable of ints or lines (e.g. an open file handle).
+    values = map(int, measurements)
+    last = deque(islice(values, window), maxlen=window)
+    count = 0
+    for value in values:
+        count += value > last[0]
+        last.append(value)
+    return count
+
+
+def test_count_increases(sample):
+    assert count_increases(sample, 1) == 7
+    assert count_increases(sample, 3) == 5
+    assert count_increases(map(str, sample), 3) == 5
+    assert count_increases(sample, 10) == 0
+    assert count_increases([], 3) == 0
+
+
 def main_part1(measurements: list) -> int:
     # Count the number of times a depth measurement increases from the previous measurement.
     # (There is no measurement before the first measurement.)
-    return sum(
-        value > prev
-        for prev, value in zip(measurements, measurements[1:])
-    )
+    return count_increases(measurements, 1)
 
 
 def test_part1(sample):
@@ -26,21 +92,65 @@ def test_part1(sample):
 
 def main_part2(measurements: list) -> int:
     # Instead, consider sums of a three-measurement sliding window.
-    moving_sum = [
-        v1 + v2 + v3
-        for v1, v2, v3 in zip(measurements, measurements[1:], measurements[2:])
-    ]
-    return sum(
-        value > prev
-        for prev, value in zip(moving_sum, moving_sum[1:])
-    )
+    return count_increases(measurements, 3)
 
 
 def test_part2(sample):
     assert main_part2(sample) == 5
 
 
+def count_increases_np(measurements: np.ndarray, window: int = 1) -> int:
+    # Window sums differ by x[i+k] - x[i], so no window sums need to be materialized.
+    return int(np.count_nonzero(measurements[window:] > measurements[:-window]))
+
+
+def main_part1_np(measurements: np.ndarray) -> int:
+    return int(np.count_nonzero(np.diff(measurements) > 0))
+
+
+def main_part2_np(measurements: np.ndarray) -> int:
+    return count_increases_np(measurements, 3)
+
+
+def test_part1_np(sample):
+    assert main_part1_np(np.asarray(sample)) == 7
+
+
+def test_part2_np(sample):
+    assert main_part2_np(np.asarray(sample)) == 5
+    assert count_increases_np(np.asarray(sample), 10) == 0
+
+
+def benchmark(sizes=(10 ** 6, 10 ** 7, 10 ** 8)):
+    # Compare the list based path with the numpy one on random depth logs.
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'input')
+        for size in sizes:
+            depths = np.cumsum(rng.integers(-10, 11, size)) + 10 * size
+            np.savetxt(filename, depths, fmt='%d')
+            del depths
+
+            t = time.perf_counter()
+            data = read(filename)
+            res_list = main_part1(data), main_part2(data)
+            t_list = time.perf_counter() - t
+            del data
+
+            t = time.perf_counter()
+            data = read_array(filename)
+            res_np = main_part1_np(data), main_part2_np(data)
+            t_np = time.perf_counter() - t
+            del data
+
+            assert res_list == res_np
+            print(f'{size:>11}: list {t_list:8.2f}s  numpy {t_np:8.2f}s  x{t_list / t_np:.1f}')
+
+
 if __name__ == "__main__":
+    if '--benchmark' in sys.argv:
+        benchmark()
+        sys.exit()
     input_data = read('input')
     print(main_part1(input_data))
     print(main_part2(input_data))
@@ -1,5 +1,10 @@
 from pytest import fixture
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+import numpy as np
 
 
 @fixture
@@ -31,24 +36,36 @@ def read(filename: str) -> List[str]:
         return f.read().splitlines()
 
 
-def main_part1(lines: List[str]) -> int:
-    costs = {
-        ')': 3,
-        ']': 57,
-        '}': 1197,
-        '>': 25137,
-    }
+corrupted_costs = {
+    ')': 3,
+    ']': 57,
+    '}': 1197,
+    '>': 25137,
+}
+completion_costs = {
+    '(': 1,
+    '[': 2,
+    '{': 3,
+    '<': 4,
+}
+
 
+def classify(line: str) -> Tuple[int, Optional[int]]:
+    # (corrupted score, completion score), the completion score is None for corrupted lines
+    stack = []
+    for c in line:
+        if c in pairs:
+            stack.append(c)
+        elif c != pairs[stack.pop()]:
+            return corrupted_costs[c], None
     score = 0
-    for line in lines:
-        stack = []
-        for c in line:
-            if c in pairs:
-                stack.append(c)
-            elif c != pairs[stack.pop()]:
-                score += costs[c]
-                break
-    return score
+    for c in reversed(stack):
+        score = 5 * score + completion_costs[c]
+    return 0, score
+
+
+def main_part1(lines: List[str]) -> int:
+    return sum(classify(line)[0] for line in lines)
 
 
 def test_part1(sample):
@@ -56,27 +73,7 @@ def test_part1(sample):
 
 
 def main_part2(lines: List[str]) -> int:
-    costs = {
-        '(': 1,
-        '[': 2,
-        '{': 3,
-        '<': 4,
-    }
-
-    scores = []
-    for line in lines:
-        score = 0
-        stack = []
-        for c in line:
-            if c in pairs:
-                stack.append(c)
-            elif c != pairs[stack.pop()]:
-                break
-        else:
-            for c in reversed(stack):
-                score = 5 * score + costs[c]
-            scores.append(score)
-
+    scores = [score for _, score in map(classify, lines) if score is not None]
     scores.sort()
     return scores[len(scores) // 2]
 
@@ -85,6 +82,64 @@ def test_part2(sample):
     assert main_part2(sample) == 288957
 
 
+def check_chunk(lines: List[str]) -> Tuple[int, np.ndarray]:
+    corrupted = 0
+    completions = []
+    for line in lines:
+        error, completion = classify(line.rstrip('\n'))
+        corrupted += error
+        if completion is not None:
+            completions.append(completion)
+    # long lines overflow int64, keep exact Python ints in an object array then
+    dtype = np.int64 if max(completions, default=0) < 2 ** 63 else object
+    return corrupted, np.array(completions, dtype=dtype)
+
+
+def chunked(lines: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def check(lines: Iterable[str], workers: int = None, chunk_size: int = 1 << 16) -> Tuple[int, int]:
+    # Single pass over the lines in a process pool, at most 2 * workers chunks in flight.
+    # Only the completion scores are kept; the median is found by selection.
+    workers = workers or os.cpu_count()
+    corrupted = 0
+    completions = []
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for chunk in chunked(lines, chunk_size):
+            pending.append(executor.submit(check_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                error, scores = pending.popleft().result()
+                corrupted += error
+                completions.append(scores)
+        while pending:
+            error, scores = pending.popleft().result()
+            corrupted += error
+            completions.append(scores)
+
+    dtype = object if any(scores.dtype == object for scores in completions) else np.int64
+    scores = np.concatenate([scores.astype(dtype) for scores in completions] + [np.zeros(0, dtype=dtype)])
+    if not len(scores):
+        return corrupted, 0
+    middle = len(scores) // 2
+    return corrupted, int(np.partition(scores, middle)[middle])
+
+
+def test_check(sample):
+    assert check(sample, workers=2, chunk_size=3) == (26397, 288957)
+    assert check(iter(sample * 3), workers=2, chunk_size=4) == (3 * 26397, 288957)
+    assert check(['(' * 40, '[' * 40, '<' * 40], workers=1) == (0, 2 * (5 ** 40 - 1) // 4)
+    lines = ['((', '[' + '(' * 27, '[' + '(' * 26 + '[']
+    assert check(lines, workers=1) == (0, main_part2(lines))
+    assert check(lines, workers=2, chunk_size=1) == (0, main_part2(lines))
+
+
 if __name__ == "__main__":
     input_data = read('input')
     print(main_part1(input_data))
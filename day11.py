@@ -1,5 +1,5 @@
-from pytest import fixture
-from typing import List
+from pytest import fixture, raises
+from typing import Iterator, List, Tuple
 import numpy as np
 from scipy.signal import convolve2d
 
@@ -25,28 +25,73 @@ def read(filename: str) -> List[str]:
         return f.read().splitlines()
 
 
-def main_part1(lines: List[str]) -> int:
-    levels = np.asarray([list(map(int, line)) for line in lines])
-    total_flashes = 0
-    kernel = np.ones((3, 3), dtype=int)
-    kernel[1, 1] = 0
+BORDER = -10 ** 6
+
 
-    for _ in range(100):
-        levels += 1
+def parse(lines: List[str]) -> np.ndarray:
+    return np.asarray([list(map(int, line)) for line in lines])
 
-        flashes = np.zeros_like(levels)
-        flashes_sum = 0
-        while True:
-            flashes = convolve2d((levels + flashes) > 9, kernel, mode='same')
-            if flashes_sum == np.sum(flashes):
-                break
-            flashes_sum = np.sum(flashes)
 
-        levels += flashes
-        total_flashes += np.count_nonzero(levels > 9)
-        levels[levels > 9] = 0
+def step_dense(levels: np.ndarray) -> int:
+    # Whole grid convolutions until no new flashes appear; levels are updated in place.
+    kernel = np.ones((3, 3), dtype=int)
+    kernel[1, 1] = 0
+    levels += 1
+
+    flashes = np.zeros_like(levels)
+    flashes_sum = 0
+    while True:
+        flashes = convolve2d((levels + flashes) > 9, kernel, mode='same')
+        if flashes_sum == np.sum(flashes):
+            break
+        flashes_sum = np.sum(flashes)
+
+    levels += flashes
+    flashed = levels > 9
+    levels[flashed] = 0
+    return int(np.count_nonzero(flashed))
+
+
+def step_queue(padded: np.ndarray, offsets: List[int]) -> int:
+    # Only cells that flash touch their 8 neighbours. A cell is queued once, when it reaches 10.
+    # padded has a BORDER frame that never flashes; levels are updated in place.
+    flat = padded.ravel()
+    flat += 1
+    queue = np.flatnonzero(flat > 9).tolist()
+    # element access on a list is much cheaper than on an array once many cells flash
+    cells = flat.tolist() if len(queue) > len(flat) // 64 else flat
+    for idx in queue:
+        for offset in offsets:
+            n = idx + offset
+            cells[n] += 1
+            if cells[n] == 10:
+                queue.append(n)
+    if cells is not flat:
+        flat[:] = cells
+    flat[queue] = 0
+    padded[[0, -1], :] = BORDER
+    padded[:, [0, -1]] = BORDER
+    return len(queue)
+
+
+def simulate(levels: np.ndarray, dense_fraction: float = 0.5) -> Iterator[int]:
+    # Yield the number of flashes of every step. Steps that start with more than
+    # dense_fraction of the grid about to flash run the convolution path instead of the queue.
+    padded = np.full((levels.shape[0] + 2, levels.shape[1] + 2), BORDER, dtype=np.int32)
+    padded[1:-1, 1:-1] = levels
+    inner = padded[1:-1, 1:-1]
+    width = padded.shape[1]
+    offsets = [di * width + dj for di in (-1, 0, 1) for dj in (-1, 0, 1) if di or dj]
+    while True:
+        if np.count_nonzero(inner >= 9) > dense_fraction * inner.size:
+            yield step_dense(inner)
+        else:
+            yield step_queue(padded, offsets)
 
-    return total_flashes
+
+def main_part1(lines: List[str]) -> int:
+    steps = simulate(parse(lines))
+    return sum(next(steps) for _ in range(100))
 
 
 def test_part1(sample):
@@ -54,33 +99,110 @@ def test_part1(sample):
 
 
 def main_part2(lines: List[str]) -> int:
-    levels = np.asarray([list(map(int, line)) for line in lines])
-    kernel = np.ones((3, 3), dtype=int)
-    kernel[1, 1] = 0
-
-    for step in range(1000):
-        levels += 1
-
-        flashes = np.zeros_like(levels)
-        flashes_sum = 0
-        while True:
-            flashes = convolve2d((levels + flashes) > 9, kernel, mode='same')
-            if flashes_sum == np.sum(flashes):
-                break
-            flashes_sum = np.sum(flashes)
-
-        levels += flashes
-        levels[levels > 9] = 0
-        if np.count_nonzero(levels) == 0:
-            return step + 1
-
-    return 0
+    flashes, first_sync = simulate_batch(parse(lines)[None], 0)
+    return int(first_sync[0])
 
 
 def test_part2(sample):
     assert main_part2(sample) == 195
 
 
+def test_simulate(sample):
+    levels = parse(sample)
+    dense, queue = simulate(levels, dense_fraction=0), simulate(levels, dense_fraction=1)
+    for _ in range(300):
+        assert next(dense) == next(queue)
+
+
+def step_batch(levels: np.ndarray) -> np.ndarray:
+    # Advance a (B, H, W) batch by one step in place; returns flashes per grid.
+    # Every round only the newly flashing cells add to their neighbours.
+    batch, height, width = levels.shape
+    levels += 1
+    flashed = np.zeros(levels.shape, dtype=bool)
+    new = levels > 9
+    neighbours = np.zeros((batch, height + 2, width + 2), dtype=levels.dtype)
+    while new.any():
+        flashed |= new
+        neighbours[:] = 0
+        for di in range(3):
+            for dj in range(3):
+                if di != 1 or dj != 1:
+                    neighbours[:, di:di + height, dj:dj + width] += new
+        levels += neighbours[:, 1:-1, 1:-1]
+        new = (levels > 9) & ~flashed
+    levels[flashed] = 0
+    return flashed.sum(axis=(1, 2))
+
+
+def simulate_batch(levels: np.ndarray, steps: int, max_steps: int = 10 ** 6) -> Tuple[np.ndarray, np.ndarray]:
+    # Flashes of every grid after `steps` steps and the first step every octopus flashes (0 if never).
+    # States are hashed per grid; once a grid repeats a state its periodic regime is extrapolated
+    # and the grid leaves the batch.
+    levels = np.array(levels, dtype=np.int32)
+    batch, height, width = levels.shape
+    flashes = np.zeros(batch, dtype=np.int64)
+    first_sync = np.zeros(batch, dtype=np.int64)
+    seen = [{grid.tobytes(): 0} for grid in levels.astype(np.uint8)]
+    totals = [np.zeros(batch, dtype=np.int64)]
+    active = np.arange(batch)
+
+    for step in range(1, max_steps + 1):
+        if not len(active):
+            break
+        state = levels[active]
+        counts = step_batch(state)
+        levels[active] = state
+        total = totals[-1].copy()
+        total[active] += counts
+        totals.append(total)
+        synced = active[(counts == height * width) & (first_sync[active] == 0)]
+        first_sync[synced] = step
+
+        resolved = []
+        for k, (b, grid) in enumerate(zip(active.tolist(), state.astype(np.uint8))):
+            key = grid.tobytes()
+            start = seen[b].get(key)
+            if start is not None:
+                if steps > step:
+                    cycles, rest = divmod(steps - start, step - start)
+                    flashes[b] = totals[start + rest][b] + cycles * (total[b] - totals[start][b])
+                else:
+                    flashes[b] = totals[steps][b]
+                resolved.append(k)
+            elif step >= steps and first_sync[b]:
+                flashes[b] = totals[steps][b]
+                resolved.append(k)
+            else:
+                seen[b][key] = step
+        active = np.delete(active, resolved)
+
+    # grids still running after max_steps without a repeated state or a sync
+    if len(active):
+        if steps >= len(totals):
+            raise ValueError(f'{steps} steps not reached within max_steps={max_steps}')
+        flashes[active] = totals[steps][active]
+    return flashes, first_sync
+
+
+def test_simulate_batch(sample):
+    levels = parse(sample)
+    synced = np.zeros_like(levels)
+    flashes, first_sync = simulate_batch(np.stack([levels, synced, levels.T]), 100)
+    assert flashes.tolist() == [1656, 1000, main_part1([''.join(map(str, row)) for row in levels.T])]
+    assert first_sync.tolist() == [195, 10, main_part2([''.join(map(str, row)) for row in levels.T])]
+
+    flashes, first_sync = simulate_batch(levels[None], 100, max_steps=150)
+    assert flashes.tolist() == [1656] and first_sync.tolist() == [0]
+    with raises(ValueError):
+        simulate_batch(levels[None], 100, max_steps=50)
+
+    flashes, _ = simulate_batch(levels[None], 10 ** 9)
+    cycle = simulate(levels)
+    expected = sum(next(cycle) for _ in range(195)) + (10 ** 9 - 195) // 10 * 100
+    assert flashes[0] == expected
+
+
 if __name__ == "__main__":
     input_data = read('input')
     print(main_part1(input_data))
@@ -1,4 +1,5 @@
-from typing import List
+from typing import Iterator, List, Tuple
+from functools import lru_cache
 from pytest import fixture
 from textwrap import dedent
 from collections import defaultdict
@@ -69,8 +70,7 @@ def is_small(cave: str) -> bool:
     return cave == cave.lower()
 
 
-def main_part1(connections: List[str]) -> int:
-    # How many paths through this cave system are there that visit small caves at most once?
+def parse(connections: List[str]) -> defaultdict:
     caves = defaultdict(set)
     for conn in connections:
         cave1, cave2 = conn.split('-')
@@ -78,26 +78,68 @@ def main_part1(connections: List[str]) -> int:
             caves[cave1].add(cave2)
         if (cave2 != END) and (cave1 != START):
             caves[cave2].add(cave1)
+    return caves
+
+
+def compile_caves(connections: List[str]) -> Tuple[List[str], List[Tuple[int, ...]], List[int]]:
+    # Map caves to integer ids (start is 0); small caves get a bit of the visited mask, big ones 0.
+    caves = parse(connections)
+    names = [START] + sorted((caves.keys() | set().union(*caves.values())) - {START})
+    ids = {name: i for i, name in enumerate(names)}
+    neighbours = [tuple(ids[c] for c in sorted(caves[name])) for name in names]
+    bits = [1 << i if is_small(name) else 0 for i, name in enumerate(names)]
+    return names, neighbours, bits
+
+
+def count_paths(connections: List[str], revisits: int = 0) -> int:
+    # Memoized DFS over (cave, visited small caves, small caves visited twice, revisits left);
+    # the cost depends on the amount of distinct states, not on the amount of paths.
+    # Up to `revisits` distinct small caves may be visited twice.
+    names, neighbours, bits = compile_caves(connections)
+    end = names.index(END) if END in names else -1
+
+    @lru_cache(maxsize=None)
+    def count(cave: int, visited: int, twice: int, budget: int) -> int:
+        if cave == end:
+            return 1
+        res = 0
+        for n in neighbours[cave]:
+            if not visited & bits[n]:
+                res += count(n, visited | bits[n], twice, budget)
+            elif budget and not twice & bits[n]:
+                res += count(n, visited, twice | bits[n], budget - 1)
+        return res
+
+    return count(0, bits[0], 0, revisits)
+
+
+def iter_paths(connections: List[str], revisits: int = 0) -> Iterator[Tuple[str, ...]]:
+    # Lazily yield every path with the same revisit rules as count_paths;
+    # only the current path is kept in memory.
+    names, neighbours, bits = compile_caves(connections)
+    end = names.index(END) if END in names else -1
+    path = [0]
+
+    def walk(cave: int, visited: int, twice: int, budget: int) -> Iterator[Tuple[str, ...]]:
+        if cave == end:
+            yield tuple(names[i] for i in path)
+            return
+        for n in neighbours[cave]:
+            if not visited & bits[n]:
+                path.append(n)
+                yield from walk(n, visited | bits[n], twice, budget)
+                path.pop()
+            elif budget and not twice & bits[n]:
+                path.append(n)
+                yield from walk(n, visited, twice | bits[n], budget - 1)
+                path.pop()
+
+    return walk(0, bits[0], 0, revisits)
 
-    count = 0
-    stack = [[START, ], ]
-    path = ['', ]
-    while stack:
-        while stack and not stack[-1]:
-            stack.pop()
-            path.pop()
-        if not stack:
-            break
-        cave = stack[-1].pop()
-        if cave == END:
-            count += 1
-            continue
-        if is_small(cave) and cave in path:
-            continue
-        path.append(cave)
-        next_caves = caves[cave]
-        stack.append(list(next_caves))
-    return count
+
+def main_part1(connections: List[str]) -> int:
+    # How many paths through this cave system are there that visit small caves at most once?
+    return count_paths(connections)
 
 
 def test_part1_1(sample1):
@@ -113,40 +155,8 @@ def test_part1_3(sample3):
 
 
 def main_part2(connections: List[str]) -> int:
-    # How many paths through this cave system are there that visit small caves at most once?
-    caves = defaultdict(set)
-    for conn in connections:
-        cave1, cave2 = conn.split('-')
-        if (cave2 != START) and (cave1 != END):
-            caves[cave1].add(cave2)
-        if (cave2 != END) and (cave1 != START):
-            caves[cave2].add(cave1)
-
-    count = 0
-    stack = [[START, ], ]
-    path = ['', ]
-    single_small_cave = ''
-    while stack:
-        while stack and not stack[-1]:
-            stack.pop()
-            if path.pop() == single_small_cave:
-                single_small_cave = ''
-        if not stack:
-            break
-        cave = stack[-1].pop()
-        if cave == END:
-            count += 1
-            continue
-        if is_small(cave) and cave in path:
-            if single_small_cave == '':
-                single_small_cave = cave
-            else:
-                continue
-
-        path.append(cave)
-        next_caves = caves[cave]
-        stack.append(list(next_caves))
-    return count
+    # A single small cave can be visited at most twice, and the remaining small caves at most once.
+    return count_paths(connections, revisits=1)
 
 
 def test_part2_1(sample1):
@@ -161,6 +171,22 @@ def test_part2_3(sample3):
     assert main_part2(sample3) == 3509
 
 
+def test_revisits(sample1, sample3):
+    paths = list(iter_paths(sample1, revisits=1))
+    assert len(paths) == len(set(paths)) == 36
+    assert ('start', 'A', 'b', 'A', 'b', 'A', 'c', 'A', 'end') in paths
+    assert sum(1 for _ in iter_paths(sample3)) == 226
+
+    for revisits in range(4):
+        paths = list(iter_paths(sample1, revisits))
+        assert len(paths) == len(set(paths)) == count_paths(sample1, revisits)
+        for path in paths:
+            small = [cave for cave in path if is_small(cave)]
+            assert len(small) - len(set(small)) <= revisits
+            assert all(small.count(cave) <= 2 for cave in small)
+    assert count_paths(sample1, 1) < count_paths(sample1, 2)
+
+
 if __name__ == "__main__":
     input_data = read('input')
     print(main_part1(input_data))
@@ -1,7 +1,34 @@
 from pytest import fixture
 from textwrap import dedent
+from io import StringIO
+from typing import List, TextIO, Tuple
+import sys
 import numpy as np
 
+AXES = {'y': 0, 'x': 1}
+
+# 4x6 capital letters, glyphs are 5 columns apart
+LETTERS = {
+    'A': ('.##.', '#..#', '#..#', '####', '#..#', '#..#'),
+    'B': ('###.', '#..#', '###.', '#..#', '#..#', '###.'),
+    'C': ('.##.', '#..#', '#...', '#...', '#..#', '.##.'),
+    'E': ('####', '#...', '###.', '#...', '#...', '####'),
+    'F': ('####', '#...', '###.', '#...', '#...', '#...'),
+    'G': ('.##.', '#..#', '#...', '#.##', '#..#', '.###'),
+    'H': ('#..#', '#..#', '####', '#..#', '#..#', '#..#'),
+    'I': ('.###', '..#.', '..#.', '..#.', '..#.', '.###'),
+    'J': ('..##', '...#', '...#', '...#', '#..#', '.##.'),
+    'K': ('#..#', '#.#.', '##..', '#.#.', '#.#.', '#..#'),
+    'L': ('#...', '#...', '#...', '#...', '#...', '####'),
+    'O': ('.##.', '#..#', '#..#', '#..#', '#..#', '.##.'),
+    'P': ('###.', '#..#', '#..#', '###.', '#...', '#...'),
+    'R': ('###.', '#..#', '#..#', '###.', '#.#.', '#..#'),
+    'S': ('.###', '#...', '#...', '.##.', '...#', '###.'),
+    'U': ('#..#', '#..#', '#..#', '#..#', '#..#', '.##.'),
+    'Z': ('####', '...#', '..#.', '.#..', '#...', '####'),
+}
+GLYPHS = {'\n'.join(rows): letter for letter, rows in LETTERS.items()}
+
 
 @fixture
 def sample():
@@ -81,7 +108,7 @@ def test_part1(sample):
     assert main_part1(sample) == 17
 
 
-def main_part2(dots_folds: str) -> int:
+def main_part2(dots_folds: str) -> np.ndarray:
     dots, folds = parse(dots_folds)
     x_max = max(x for x, y in dots)
     y_max = max(y for x, y in dots)
@@ -94,19 +121,111 @@ def main_part2(dots_folds: str) -> int:
             paper = fold_up(paper, idx)
         else:
             paper = fold_left(paper, idx)
-
-    print('')
-    for line in paper:
-        line = ''.join('#' if v else ' ' for v in line)
-        print(line)
-    return np.count_nonzero(paper)
+    return paper
 
 
 def test_part2(sample):
-    assert main_part2(sample)
+    paper = main_part2(sample)
+    assert np.count_nonzero(paper) == 16
+    assert to_text(paper[:5]) == '#####\n#   #\n#   #\n#   #\n#####'
+
+
+def to_text(paper: np.ndarray, on: str = '#', off: str = ' ') -> str:
+    # one vectorized pass instead of a string per row
+    chars = np.full((paper.shape[0], paper.shape[1] + 1), ord('\n'), dtype=np.uint8)
+    chars[:, :-1] = np.where(paper, ord(on), ord(off))
+    return chars.tobytes()[:-1].decode()
+
+
+def render(paper: np.ndarray, file: TextIO = None):
+    # write the whole bitmap with a single call
+    (file or sys.stdout).write(to_text(paper) + '\n')
+
+
+def ocr(paper: np.ndarray) -> str:
+    # Decode 4x6 letters placed every 5 columns; unknown glyphs become '?'.
+    height, width = 6, 5
+    padded = np.zeros((height, -(-paper.shape[1] // width) * width), dtype=bool)
+    padded[:min(height, paper.shape[0]), :paper.shape[1]] = paper[:height]
+    return ''.join(
+        GLYPHS.get(to_text(padded[:, i:i + 4], off='.'), '?')
+        for i in range(0, padded.shape[1], width)
+    )
+
+
+def test_ocr():
+    letters = 'ABCEFGHIJKLOPRSUZ'
+    paper = np.zeros((6, 5 * len(letters) - 1), dtype=bool)
+    for i, letter in enumerate(letters):
+        glyph = np.array([list(row) for row in LETTERS[letter]]) == '#'
+        paper[:, 5 * i:5 * i + 4] = glyph
+    assert ocr(paper) == letters
+    assert ocr(np.ones((6, 4), dtype=bool)) == '?'
+
+    out = StringIO()
+    render(paper[:, :4], out)
+    assert out.getvalue() == ' ## \n#  #\n#  #\n####\n#  #\n#  #\n'
+
+
+def parse_array(dots_folds: str) -> Tuple[np.ndarray, List[Tuple[str, int]]]:
+    # dots as an (N, 2) array of (y, x), same order as parse
+    dots, folds = parse(dots_folds)
+    return np.array(dots, dtype=np.int64).reshape(-1, 2), folds
+
+
+def fold_sparse(dots: np.ndarray, axis: str, idx: int) -> np.ndarray:
+    dots = dots.copy()
+    c = dots[:, AXES[axis]]
+    dots[:, AXES[axis]] = np.where(c > idx, 2 * idx - c, c)
+    return np.unique(dots, axis=0)
+
+
+def fold_all(dots: np.ndarray, folds: List[Tuple[str, int]]) -> np.ndarray:
+    # Folds along one axis never move the other coordinate, so every axis gets a composed
+    # transform evaluated on its distinct values only, then the dots are mapped in a single pass.
+    res = np.empty_like(dots)
+    for axis, column in AXES.items():
+        values, inverse = np.unique(dots[:, column], return_inverse=True)
+        for fold_axis, idx in folds:
+            if fold_axis == axis:
+                values = np.where(values > idx, 2 * idx - values, values)
+        res[:, column] = values[inverse.ravel()]
+    return np.unique(res, axis=0)
+
+
+def main_part1_sparse(dots_folds: str) -> int:
+    dots, folds = parse_array(dots_folds)
+    return len(fold_sparse(dots, *folds[0]))
+
+
+def main_part2_sparse(dots_folds: str) -> int:
+    dots, folds = parse_array(dots_folds)
+    return len(fold_all(dots, folds))
+
+
+def test_sparse(sample):
+    assert main_part1_sparse(sample) == 17
+    assert main_part2_sparse(sample) == 16
+
+    dots, folds = parse_array(sample)
+    step_by_step = dots
+    for axis, idx in folds:
+        step_by_step = fold_sparse(step_by_step, axis, idx)
+    assert np.array_equal(step_by_step, fold_all(dots, folds))
+
+    far = dedent("""\
+        3000000,3999997
+        2,3
+
+        fold along y=2000000
+        fold along x=1500000
+    """)
+    assert fold_all(*parse_array(far)).tolist() == [[3, 0], [3, 2]]
 
 
 if __name__ == "__main__":
     input_data = read('input')
     print(main_part1(input_data))
-    print(main_part2(input_data))
+    paper = main_part2(input_data)
+    render(paper)
+    print(ocr(paper))
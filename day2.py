@@ -1,4 +1,13 @@
 from pytest import fixture
+from typing import Iterable, Iterator, List, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+import numpy as np
+
+FORWARD, DOWN, UP = 0, 1, 2
+DIRECTIONS = {'forward': FORWARD, 'down': DOWN, 'up': UP}
 
 
 @fixture
@@ -54,6 +63,105 @@ def test_part2(sample):
     assert main_part2(sample) == 900
 
 
+def compile_commands(commands: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    # Parse the commands once into direction codes and steps; reuse the result across analyses.
+    directions = np.empty(len(commands), dtype=np.uint8)
+    steps = np.empty(len(commands), dtype=np.int32)
+    for i, cmd in enumerate(commands):
+        direction, step = cmd.split()
+        directions[i] = DIRECTIONS[direction]
+        steps[i] = int(step)
+    return directions, steps
+
+
+def main_part1_compiled(compiled: Tuple[np.ndarray, np.ndarray]) -> int:
+    directions, steps = compiled
+    steps = steps.astype(np.int64)
+    x = steps[directions == FORWARD].sum()
+    depth = steps[directions == DOWN].sum() - steps[directions == UP].sum()
+    return int(x) * int(depth)
+
+
+def main_part2_compiled(compiled: Tuple[np.ndarray, np.ndarray]) -> int:
+    directions, steps = compiled
+    steps = steps.astype(np.int64)
+    forward = directions == FORWARD
+    aim = np.cumsum(np.where(directions == DOWN, steps, 0) - np.where(directions == UP, steps, 0))
+    x = steps[forward].sum()
+    depth = (steps[forward] * aim[forward]).sum()
+    return int(x) * int(depth)
+
+
+def test_part1_compiled(sample):
+    assert main_part1_compiled(compile_commands(sample)) == 150
+
+
+def test_part2_compiled(sample):
+    compiled = compile_commands(sample)
+    assert main_part2_compiled(compiled) == 900
+    assert main_part2_compiled(compiled) == 900
+
+
+def summarize(commands: Iterable[str]) -> Tuple[int, int, int]:
+    # Reduce a chunk of commands to (dx, ddepth, daim) assuming the chunk starts with aim 0.
+    # Starting the chunk with aim a instead only adds a * dx to the depth.
+    dx, ddepth, daim = 0, 0, 0
+    for cmd in commands:
+        direction, step = cmd.split()
+        step = int(step)
+        if direction == 'forward':
+            dx += step
+            ddepth += step * daim
+        elif direction == 'up':
+            daim -= step
+        elif direction == 'down':
+            daim += step
+    return dx, ddepth, daim
+
+
+def combine(first: Tuple[int, int, int], second: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    # Summary of `first` followed by `second`; associative but not commutative.
+    dx1, ddepth1, daim1 = first
+    dx2, ddepth2, daim2 = second
+    return dx1 + dx2, ddepth1 + ddepth2 + daim1 * dx2, daim1 + daim2
+
+
+def chunked(commands: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    commands = iter(commands)
+    while True:
+        chunk = list(islice(commands, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def main_part2_parallel(commands: Iterable[str], workers: int = None, chunk_size: int = 1 << 20) -> int:
+    # Chunks are summarized in a process pool and combined in input order,
+    # with at most 2 * workers chunks in flight so the input can be streamed.
+    workers = workers or os.cpu_count()
+    total = (0, 0, 0)
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for chunk in chunked(commands, chunk_size):
+            pending.append(executor.submit(summarize, chunk))
+            if len(pending) >= 2 * workers:
+                total = combine(total, pending.popleft().result())
+        while pending:
+            total = combine(total, pending.popleft().result())
+    x, depth, aim = total
+    return x * depth
+
+
+def test_combine(sample):
+    for i in range(len(sample) + 1):
+        assert combine(summarize(sample[:i]), summarize(sample[i:])) == summarize(sample)
+
+
+def test_part2_parallel(sample):
+    assert main_part2_parallel(sample, workers=2, chunk_size=2) == main_part2(sample)
+    assert main_part2_parallel(sample * 100, workers=2, chunk_size=7) == main_part2(sample * 100)
+
+
 if __name__ == "__main__":
     input_data = read('input')
     print(main_part1(input_data))
@@ -1,4 +1,6 @@
 from pytest import fixture
+from typing import Callable, List, Tuple
+import numpy as np
 
 
 @fixture
@@ -86,6 +88,128 @@ def test_part2(sample):
     assert main_part2(sample) == 230
 
 
+def pack(numbers: List[str]) -> Tuple[np.ndarray, int]:
+    # Parse the report once into rows of np.packbits, so any bit width is supported.
+    width = len(numbers[0])
+    bits = np.frombuffer(''.join(numbers).encode(), dtype=np.uint8).reshape(-1, width) == ord('1')
+    return np.packbits(bits, axis=1), width
+
+
+def bit_column(packed: np.ndarray, pos: int) -> np.ndarray:
+    return (packed[:, pos // 8] >> (7 - pos % 8)) & 1
+
+
+def to_int(row: np.ndarray, width: int) -> int:
+    return int.from_bytes(row.tobytes(), 'big') >> (8 * row.size - width)
+
+
+def main_part1_packed(packed: np.ndarray, width: int) -> int:
+    cnt = np.unpackbits(packed, axis=1, count=width).sum(axis=0, dtype=np.int64)
+    n = len(packed)
+    gamma = np.packbits(2 * cnt > n)
+    epsilon = np.packbits(2 * cnt < n)
+    return to_int(gamma, width) * to_int(epsilon, width)
+
+
+def rating(packed: np.ndarray, width: int, most_common: bool) -> int:
+    # Keep the indices of matching numbers and shrink them by boolean masking at each position.
+    idx = np.arange(len(packed))
+    pos = 0
+    while len(idx) > 1:
+        bits = bit_column(packed[idx], pos)
+        ones = 2 * np.count_nonzero(bits) >= len(idx)
+        keep = ones if most_common else not ones
+        idx = idx[bits == keep]
+        pos += 1
+    return to_int(packed[idx[0]], width)
+
+
+def main_part2_packed(packed: np.ndarray, width: int) -> int:
+    ogr = rating(packed, width, most_common=True)
+    csr = rating(packed, width, most_common=False)
+    return csr * ogr
+
+
+def test_part1_packed(sample):
+    assert main_part1_packed(*pack(sample)) == 198
+
+
+def test_part2_packed(sample):
+    assert main_part2_packed(*pack(sample)) == 230
+
+
+def test_packed_wide(sample):
+    wide = [v * 15 for v in sample]
+    packed, width = pack(wide)
+    assert width == 75
+    assert main_part1_packed(packed, width) == main_part1(wide)
+    assert main_part2_packed(packed, width) == main_part2(wide)
+
+
+def most_common(zeros: int, ones: int) -> int:
+    # oxygen generator rating: most common bit, 1 on tie
+    return 1 if ones >= zeros else 0
+
+
+def least_common(zeros: int, ones: int) -> int:
+    # CO2 scrubber rating: least common bit, 0 on tie
+    return 0 if ones >= zeros else 1
+
+
+class BitTrie:
+    # Prefix tree annotated with the amount of numbers below each node.
+    # Built once, every rating query then walks a single path.
+    def __init__(self, numbers: List[str]):
+        self.width = len(numbers[0])
+        self._counts = [0]
+        self._children = [[-1, -1]]
+        for number in numbers:
+            node = 0
+            self._counts[node] += 1
+            for bit in number:
+                bit = bit == '1'
+                child = self._children[node][bit]
+                if child == -1:
+                    child = len(self._counts)
+                    self._children[node][bit] = child
+                    self._counts.append(0)
+                    self._children.append([-1, -1])
+                node = child
+                self._counts[node] += 1
+
+    def _count(self, node: int) -> int:
+        return self._counts[node] if node != -1 else 0
+
+    def rating(self, policy: Callable[[int, int], int]) -> int:
+        # policy(zeros, ones) picks the bit to keep while more than one number is left
+        node = 0
+        value = 0
+        for _ in range(self.width):
+            zero, one = self._children[node]
+            if self._counts[node] > 1:
+                bit = policy(self._count(zero), self._count(one))
+            else:
+                bit = int(one != -1)
+            node = self._children[node][bit]
+            if node == -1:
+                raise ValueError('no number matches the rating criteria')
+            value = 2 * value + bit
+        return value
+
+
+def main_part2_trie(numbers: List[str]) -> int:
+    trie = BitTrie(numbers)
+    return trie.rating(most_common) * trie.rating(least_common)
+
+
+def test_part2_trie(sample):
+    assert main_part2_trie(sample) == 230
+    trie = BitTrie(sample)
+    assert trie.rating(most_common) == 23
+    assert trie.rating(least_common) == 10
+    assert trie.rating(lambda zeros, ones: 0) == 0b00010
+
+
 if __name__ == "__main__":
     input_data = read('input')
     print(main_part1(input_data))
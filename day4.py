@@ -1,5 +1,7 @@
 from pytest import fixture
-from typing import List, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
+from collections import defaultdict
+import numpy as np
 
 
 @fixture
@@ -103,6 +105,114 @@ def test_part2(sample):
     assert main_part2(sample) == 1924
 
 
+def play(boards: List[Board], draws: Iterable[int]) -> Iterator[Tuple[int, int, int]]:
+    # Yield (turn, board, score) every time a board wins; draws may come from a live stream.
+    # Each number only touches the cells that contain it.
+    cells: Dict[int, List[Tuple[int, int, int]]] = defaultdict(list)
+    for b, board in enumerate(boards):
+        for i, line in enumerate(board._board):
+            for j, v in enumerate(line):
+                if v != -1:
+                    cells[v].append((b, i, j))
+
+    unmarked = [board.get_score() for board in boards]
+    rows = [[0] * len(board._board) for board in boards]
+    columns = [[0] * len(board._board[0]) for board in boards]
+    won = [False] * len(boards)
+    for turn, number in enumerate(draws):
+        for b, i, j in cells.pop(number, ()):
+            if won[b]:
+                continue
+            unmarked[b] -= number
+            rows[b][i] += 1
+            columns[b][j] += 1
+            if rows[b][i] == len(columns[b]) or columns[b][j] == len(rows[b]):
+                won[b] = True
+                yield turn, b, unmarked[b] * number
+
+
+def main_part1_stream(numbers_boards: str) -> int:
+    numbers, boards = parse(numbers_boards)
+    for turn, board, score in play(boards, numbers):
+        return score
+    return 0
+
+
+def main_part2_stream(numbers_boards: str) -> int:
+    numbers, boards = parse(numbers_boards)
+    score = 0
+    for turn, board, score in play(boards, numbers):
+        pass
+    return score
+
+
+def test_part1_stream(sample):
+    assert main_part1_stream(sample) == 4512
+
+
+def test_part2_stream(sample):
+    assert main_part2_stream(sample) == 1924
+    numbers, boards = parse(sample)
+    assert [(turn, board) for turn, board, _ in play(boards, iter(numbers))] == [(11, 2), (13, 0), (14, 1)]
+
+
+def parse_array(numbers_boards: str) -> Tuple[np.ndarray, np.ndarray]:
+    # Stack all boards into a single (boards, size, size) array.
+    numbers, *boards = numbers_boards.split('\n\n')
+    numbers = np.array(numbers.split(','), dtype=np.int64)
+    size = len(boards[0].split('\n', 1)[0].split())
+    boards = np.array(' '.join(boards).split(), dtype=np.int64).reshape(-1, size, size)
+    return numbers, boards
+
+
+def winning_turns(numbers: np.ndarray, boards: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Map every cell to the turn its number is drawn (never drawn -> len(numbers)).
+    # A line is complete at the max turn of its cells, a board wins at the min over its lines.
+    turn_of = np.full(max(numbers.max(), boards.max()) + 1, len(numbers), dtype=np.int64)
+    turn_of[numbers[::-1]] = np.arange(len(numbers) - 1, -1, -1)
+    turns = turn_of[boards]
+    win = np.minimum(turns.max(axis=2).min(axis=1), turns.max(axis=1).min(axis=1))
+    return turns, win
+
+
+def score(numbers: np.ndarray, boards: np.ndarray, turns: np.ndarray, win: np.ndarray, board: int) -> int:
+    unmarked = turns[board] > win[board]
+    return int(boards[board][unmarked].sum()) * int(numbers[win[board]])
+
+
+def main_part1_np(numbers_boards: str) -> int:
+    numbers, boards = parse_array(numbers_boards)
+    turns, win = winning_turns(numbers, boards)
+    first = int(np.argmin(win))
+    if win[first] == len(numbers):
+        return 0
+    return score(numbers, boards, turns, win, first)
+
+
+def main_part2_np(numbers_boards: str) -> int:
+    numbers, boards = parse_array(numbers_boards)
+    turns, win = winning_turns(numbers, boards)
+    # boards that never win are ignored; on ties the board that comes last is the last one left
+    finished = np.flatnonzero(win < len(numbers))
+    if not len(finished):
+        return 0
+    last = finished[len(finished) - 1 - int(np.argmax(win[finished][::-1]))]
+    return score(numbers, boards, turns, win, last)
+
+
+def test_part1_np(sample):
+    assert main_part1_np(sample) == 4512
+
+
+def test_part2_np(sample):
+    assert main_part2_np(sample) == 1924
+
+    never = '\n'.join(' '.join(str(v) for v in range(100 + 5 * i, 105 + 5 * i)) for i in range(5))
+    extended = sample + '\n' + never + '\n'
+    assert main_part2_np(extended) == main_part2_stream(extended) == 1924
+    assert main_part2_np('1,2\n\n' + never) == 0
+
+
 if __name__ == "__main__":
     input_data = read('input')
     print(main_part1(input_data))
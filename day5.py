@@ -1,7 +1,14 @@
 from pytest import fixture
-from typing import List, Tuple
+from typing import Dict, List, Tuple
+from bisect import bisect_left, insort
+from collections import defaultdict
+import sys
+import time
 import numpy as np
 
+# Bounding boxes up to this many cells are counted on a dense grid.
+DENSE_CELLS = 1 << 26
+
 
 @fixture
 def sample():
@@ -24,37 +31,117 @@ def read(filename: str) -> list:
         return f.read().splitlines()
 
 
-def parse(vents: List[str]) -> Tuple[List, int, int]:
-    x_max, y_max = 0, 0
-    res = []
-    for line in vents:
-        p_from, p_to = line.split(' -> ')
-        x_from, y_from = map(int, p_from.split(','))
-        x_to, y_to = map(int, p_to.split(','))
-
-        if x_from < x_to or x_from == x_to and y_from < y_to:
-            res.append((
-                (x_from, y_from), (x_to, y_to)
-            ))
-        else:
-            res.append((
-                (x_to, y_to), (x_from, y_from)
-            ))
-        x_max = max(x_max, x_from, x_to)
-        y_max = max(y_max, y_from, y_to)
-
-    return res, x_max, y_max
+def parse_array(vents: List[str]) -> np.ndarray:
+    # (segments, 4) array of x_from, y_from, x_to, y_to
+    values = ','.join(line.replace(' -> ', ',') for line in vents).split(',')
+    return np.array(values, dtype=np.int64).reshape(-1, 4)
+
+
+def rasterize(segments: np.ndarray, diagonals: bool) -> Tuple[np.ndarray, np.ndarray]:
+    # Expand every segment into its points in one vectorized step.
+    x_from, y_from, x_to, y_to = segments.T
+    dx, dy = np.sign(x_to - x_from), np.sign(y_to - y_from)
+    lengths = np.maximum(np.abs(x_to - x_from), np.abs(y_to - y_from)) + 1
+    keep = (dx == 0) | (dy == 0) | diagonals
+    x_from, y_from, dx, dy, lengths = x_from[keep], y_from[keep], dx[keep], dy[keep], lengths[keep]
+
+    seg = np.repeat(np.arange(len(lengths)), lengths)
+    offset = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return x_from[seg] + offset * dx[seg], y_from[seg] + offset * dy[seg]
+
+
+def count_overlaps_dense(segments: np.ndarray, diagonals: bool) -> int:
+    x, y = rasterize(segments, diagonals)
+    if not len(x):
+        return 0
+    height = segments[:, 1::2].max() + 1
+    field = np.bincount(x * height + y)
+    return int(np.count_nonzero(field >= 2))
+
+
+def count_in(columns: List[int], start: int, end: int) -> int:
+    # number of sorted columns within [start, end)
+    return bisect_left(columns, end) - bisect_left(columns, start)
+
+
+def row_overlaps(intervals: List[Tuple[int, int]], single: List[int], multi: List[int]) -> int:
+    # Points of a row covered at least twice, given its [start, end) intervals
+    # and the sorted columns crossed by exactly one / several vertical segments.
+    # Columns in `multi` are already counted by the caller.
+    events = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    res = 0
+    coverage = 0
+    for (x, delta), (x_next, _) in zip(events, events[1:]):
+        coverage += delta
+        if x == x_next:
+            continue
+        if coverage >= 2:
+            res += x_next - x - count_in(multi, x, x_next)
+        elif coverage == 1:
+            res += count_in(single, x, x_next)
+    return res
+
+
+def count_overlaps_sparse(segments: np.ndarray, diagonals: bool) -> int:
+    # Sweep the rows (fixed y) top to bottom without allocating the plane.
+    # Horizontal segments are intervals of their row, diagonals are hashed into
+    # unit intervals of every row they cross, vertical segments are kept as
+    # the set of active columns between their start and end rows.
+    rows: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    changes: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for x_from, y_from, x_to, y_to in segments.tolist():
+        if y_from == y_to:
+            rows[y_from].append((min(x_from, x_to), max(x_from, x_to) + 1))
+        elif x_from == x_to:
+            changes[min(y_from, y_to)].append((x_from, 1))
+            changes[max(y_from, y_to) + 1].append((x_from, -1))
+        elif diagonals:
+            dx = 1 if x_to > x_from else -1
+            dy = 1 if y_to > y_from else -1
+            for i in range(abs(x_to - x_from) + 1):
+                x = x_from + i * dx
+                rows[y_from + i * dy].append((x, x + 1))
+
+    active = defaultdict(int)
+    single, multi = [], []
+    res = 0
+    prev = None
+    for y in sorted(rows.keys() | changes.keys()):
+        if prev is not None:
+            # rows in between only contain vertical segments
+            res += (y - prev - 1) * len(multi)
+        for x, delta in changes.get(y, ()):
+            before = active[x]
+            after = active[x] = before + delta
+            if before == 1:
+                single.pop(bisect_left(single, x))
+            elif before >= 2 and after < 2:
+                multi.pop(bisect_left(multi, x))
+            if after == 1:
+                insort(single, x)
+            elif after >= 2 and before < 2:
+                insort(multi, x)
+            if not active[x]:
+                del active[x]
+        res += len(multi)
+        if y in rows:
+            res += row_overlaps(rows[y], single, multi)
+        prev = y
+    return res
+
+
+def count_overlaps(segments: np.ndarray, diagonals: bool) -> int:
+    # Pick the dense grid when the bounding box is small compared to the amount of segments.
+    if not len(segments):
+        return 0
+    cells = (int(segments[:, ::2].max()) + 1) * (int(segments[:, 1::2].max()) + 1)
+    if cells <= max(DENSE_CELLS, 64 * len(segments)):
+        return count_overlaps_dense(segments, diagonals)
+    return count_overlaps_sparse(segments, diagonals)
 
 
 def main_part1(vents: list) -> int:
-    lines, x_max, y_max = parse(vents)
-    field = np.zeros((x_max+1, y_max+1))
-    for (x_from, y_from), (x_to, y_to) in lines:
-        if x_from == x_to:
-            field[x_from, y_from:y_to+1] += 1
-        elif y_from == y_to:
-            field[x_from:x_to+1, y_from] += 1
-    return (field >= 2).sum()
+    return count_overlaps(parse_array(vents), diagonals=False)
 
 
 def test_part1(sample):
@@ -62,27 +149,51 @@ def test_part1(sample):
 
 
 def main_part2(vents: list) -> int:
-    lines, x_max, y_max = parse(vents)
-    field = np.zeros((x_max + 1, y_max + 1))
-    for (x_from, y_from), (x_to, y_to) in lines:
-        if x_from == x_to:
-            field[x_from, y_from:y_to + 1] += 1
-        elif y_from == y_to:
-            field[x_from:x_to + 1, y_from] += 1
-        elif y_from < y_to:
-            for i in range(y_to - y_from + 1):
-                field[x_from + i, y_from + i] += 1
-        elif y_from > y_to:
-            for i in range(y_from - y_to + 1):
-                field[x_from + i, y_from - i] += 1
-    return (field >= 2).sum()
+    return count_overlaps(parse_array(vents), diagonals=True)
 
 
 def test_part2(sample):
     assert main_part2(sample) == 12
 
 
+def test_sparse(sample):
+    segments = parse_array(sample)
+    assert count_overlaps_sparse(segments, diagonals=False) == 5
+    assert count_overlaps_sparse(segments, diagonals=True) == 12
+
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        start = rng.integers(0, 30, (50, 2))
+        direction = np.array([(1, 0), (0, 1), (1, 1), (1, -1), (-1, 0)])[rng.integers(0, 5, 50)]
+        segments = np.hstack([start, start + direction * rng.integers(0, 10, (50, 1))]) + 10
+        for diagonals in (False, True):
+            assert count_overlaps_sparse(segments, diagonals) == count_overlaps_dense(segments, diagonals)
+
+    far = 10 ** 12
+    assert main_part2([f'0,0 -> {far},0', f'5,{far} -> 5,0', '1000,1000 -> 0,0']) == 3
+
+
+def benchmark(segments: int = 10 ** 6, size: int = 1000):
+    rng = np.random.default_rng(0)
+    start = rng.integers(0, size, (segments, 2))
+    length = rng.integers(0, size // 10, segments)
+    direction = np.array([(1, 0), (0, 1), (1, 1), (1, -1)])[rng.integers(0, 4, segments)]
+    end = np.clip(start + direction * length[:, None], 0, size - 1)
+    # keep diagonals at 45 degrees after clipping
+    length = np.abs(end - start).min(axis=1, where=direction != 0, initial=size)
+    end = start + direction * length[:, None]
+    vents = [f'{a},{b} -> {c},{d}' for a, b, c, d in np.hstack([start, end]).tolist()]
+
+    for part in (main_part1, main_part2):
+        t = time.perf_counter()
+        res = part(vents)
+        print(f'{part.__name__}: {res} in {time.perf_counter() - t:.2f}s')
+
+
 if __name__ == "__main__":
+    if '--benchmark' in sys.argv:
+        benchmark()
+        sys.exit()
     input_data = read('input')
     print(main_part1(input_data))
     print(main_part2(input_data))
@@ -1,5 +1,6 @@
-from pytest import fixture
-from typing import List
+from pytest import fixture, raises
+from typing import Dict, Iterable, List
+import numpy as np
 
 
 @fixture
@@ -24,6 +25,130 @@ def lanternfish_sim(ages, days=80, days_to_double=6, days_for_new=8):
     return sum(unique_ages)
 
 
+def transition_matrix(days_to_double=6, days_for_new=8) -> List[List[int]]:
+    # new_ages = matrix @ ages for a single day
+    size = days_for_new + 1
+    matrix = [[0] * size for _ in range(size)]
+    for age in range(1, size):
+        matrix[age - 1][age] = 1
+    matrix[days_to_double][0] += 1
+    matrix[days_for_new][0] += 1
+    return matrix
+
+
+def mat_mul(a: List[List[int]], b: List[List[int]], mod: int = None) -> List[List[int]]:
+    res = [
+        [sum(a_ik * b_kj for a_ik, b_kj in zip(row, column)) for column in zip(*b)]
+        for row in a
+    ]
+    if mod is not None:
+        res = [[v % mod for v in row] for row in res]
+    return res
+
+
+def mat_vec(a: List[List[int]], v: List[int], mod: int = None) -> List[int]:
+    res = [sum(a_ij * v_j for a_ij, v_j in zip(row, v)) for row in a]
+    if mod is not None:
+        res = [x % mod for x in res]
+    return res
+
+
+def transition_powers(days: int, days_to_double=6, days_for_new=8, mod: int = None) -> List[List[List[int]]]:
+    # matrix ** (2 ** k) for every bit k of days
+    powers = [transition_matrix(days_to_double, days_for_new)]
+    for _ in range(1, days.bit_length()):
+        powers.append(mat_mul(powers[-1], powers[-1], mod))
+    return powers
+
+
+def project(unique_ages: List[int], days: int, powers: List[List[List[int]]], mod: int = None) -> List[int]:
+    # Apply matrix ** days by repeated squaring; O(log days) matrix-vector products.
+    for k in range(days.bit_length()):
+        if days >> k & 1:
+            unique_ages = mat_vec(powers[k], unique_ages, mod)
+    return unique_ages
+
+
+def lanternfish_fast(ages, days=80, days_to_double=6, days_for_new=8, mod: int = None) -> int:
+    return lanternfish_horizons(ages, [days], days_to_double, days_for_new, mod)[days]
+
+
+def lanternfish_horizons(
+        ages, horizons: Iterable[int], days_to_double=6, days_for_new=8, mod: int = None
+) -> Dict[int, int]:
+    # Population for many day horizons sharing one set of matrix powers.
+    # Exact Python ints are used; pass mod to keep huge horizons bounded.
+    horizons = list(horizons)
+    unique_ages = histograms([ages], days_for_new + 1)[0].tolist()
+
+    powers = transition_powers(max(horizons, default=0), days_to_double, days_for_new, mod)
+    res = {}
+    for days in horizons:
+        total = sum(project(unique_ages, days, powers, mod))
+        res[days] = total % mod if mod is not None else total
+    return res
+
+
+def test_lanternfish_fast(sample):
+    assert lanternfish_fast(sample, 18) == 26
+    assert lanternfish_fast(sample, 0) == 5
+    assert lanternfish_horizons(sample, [80, 256, 1000]) == {
+        days: lanternfish_sim(sample, days) for days in [80, 256, 1000]
+    }
+    assert lanternfish_fast(sample, 1000, mod=10 ** 9 + 7) == lanternfish_sim(sample, 1000) % (10 ** 9 + 7)
+    assert lanternfish_fast(sample, 100, 3, 4) == lanternfish_sim(sample, 100, 3, 4)
+
+
+def histograms(schools: List[List[int]], size: int = 9) -> np.ndarray:
+    # (schools, size) age histograms in a single np.bincount call
+    lengths = [len(ages) for ages in schools]
+    ages = np.concatenate([np.asarray(ages, dtype=np.int64) for ages in schools] + [np.zeros(0, np.int64)])
+    if ages.size and (ages.min() < 0 or ages.max() >= size):
+        raise ValueError(f'ages must be within [0, {size})')
+    school = np.repeat(np.arange(len(schools)), lengths)
+    return np.bincount(school * size + ages, minlength=len(schools) * size).reshape(-1, size)
+
+
+def population_weights(horizons: List[int], days_to_double=6, days_for_new=8) -> List[List[int]]:
+    # Population after `days` is hist @ weights, weights = ones @ matrix ** days.
+    powers = transition_powers(max(horizons, default=0), days_to_double, days_for_new)
+    powers = [[list(column) for column in zip(*power)] for power in powers]
+    return [project([1] * (days_for_new + 1), days, powers) for days in horizons]
+
+
+def lanternfish_batch(hists: np.ndarray, horizons: List[int], days_to_double=6, days_for_new=8) -> np.ndarray:
+    # Populations for a batch of (N, 9) histograms; returns (N, len(horizons)).
+    # Stays in int64 while the results fit, exact object arrays otherwise.
+    weights = population_weights(list(horizons), days_to_double, days_for_new)
+    hists = np.asarray(hists)
+    bound = max((max(w) for w in weights), default=0) * int(hists.sum(axis=1).max(initial=0))
+    if bound < 2 ** 63:
+        return hists.astype(np.int64) @ np.array(weights, dtype=np.int64).T
+    return hists.astype(object) @ np.array(weights, dtype=object).T
+
+
+def test_lanternfish_batch(sample):
+    schools = [sample, [0], [], [8, 8, 1]]
+    hists = histograms(schools)
+    assert hists[0].tolist() == [0, 1, 1, 2, 1, 0, 0, 0, 0]
+    assert hists[2].sum() == 0
+
+    horizons = [0, 18, 80, 256]
+    res = lanternfish_batch(hists, horizons)
+    assert res.dtype == np.int64
+    assert res.tolist() == [[lanternfish_sim(ages, days) for days in horizons] for ages in schools]
+
+    with raises(ValueError):
+        histograms([[3, 4, 9], [1]])
+    with raises(ValueError):
+        histograms([[-1]])
+    with raises(ValueError):
+        lanternfish_horizons([3, 4, 9], [80])
+
+    res = lanternfish_batch(hists, [1000])
+    assert res[:, 0].tolist() == [lanternfish_sim(ages, 1000) for ages in schools]
+
+
 def main_part1(ages: List[int]) -> int:
     return lanternfish_sim(ages, 80)
 
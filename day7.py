@@ -1,5 +1,5 @@
 from pytest import fixture
-from typing import List
+from typing import Callable, List
 import numpy as np
 
 
@@ -13,13 +13,117 @@ def read(filename: str) -> List[int]:
         return list(map(int, f.readline().split(',')))
 
 
+def histogram(positions: List[int]) -> np.ndarray:
+    return np.bincount(np.asarray(positions, dtype=np.int64))
+
+
+def int_dtype(bound: int):
+    # int64 while values stay below bound, exact Python ints otherwise
+    return np.int64 if bound < 2 ** 62 else object
+
+
+def linear_costs(hist: np.ndarray) -> np.ndarray:
+    # sum(hist[p] * |p - t|) for every t via prefix sums of counts and weighted counts
+    dtype = int_dtype(int(hist.sum()) * len(hist))
+    hist = hist.astype(dtype)
+    t = np.arange(len(hist)).astype(dtype)
+    count = np.cumsum(hist)
+    weighted = np.cumsum(hist * t)
+    return t * count - weighted + (weighted[-1] - weighted) - t * (count[-1] - count)
+
+
+def triangular_costs(hist: np.ndarray) -> np.ndarray:
+    # sum(hist[p] * d * (d + 1) / 2) with d = |p - t| = (sum(hist * d ** 2) + sum(hist * d)) / 2,
+    # the squared part expands to second-order sums, the linear part comes from linear_costs
+    dtype = int_dtype(int(hist.sum()) * len(hist) ** 2)
+    hist = hist.astype(dtype)
+    t = np.arange(len(hist)).astype(dtype)
+    n = hist.sum()
+    s1 = (hist * t).sum()
+    s2 = (hist * t * t).sum()
+    return (s2 - 2 * t * s1 + t * t * n + linear_costs(hist)) // 2
+
+
+def cost_at(hist: np.ndarray, t: int, triangular: bool) -> int:
+    d = np.abs(np.arange(len(hist)) - t)
+    if triangular:
+        d = d * (d + 1) // 2
+    dtype = int_dtype(int(hist.sum()) * int(d.max()))
+    return int((hist.astype(dtype) * d.astype(dtype)).sum())
+
+
+def min_cost(positions: List[int], triangular: bool = False, shortcut: bool = False) -> int:
+    # O(n + range) scan over all positions, or a median / mean shortcut
+    hist = histogram(positions)
+    if not shortcut:
+        costs = triangular_costs(hist) if triangular else linear_costs(hist)
+        return int(costs.min())
+    if not triangular:
+        # any median minimizes the sum of absolute distances
+        median = int(np.searchsorted(np.cumsum(hist), (hist.sum() + 1) // 2))
+        return cost_at(hist, median, triangular)
+    # the optimum of the triangular cost lies within 1/2 of the mean
+    mean = int((hist * np.arange(len(hist))).sum()) // int(hist.sum())
+    return min(cost_at(hist, t, triangular) for t in (mean, mean + 1) if t < len(hist))
+
+
+def linear(d: np.ndarray) -> np.ndarray:
+    return d
+
+
+def triangular(d: np.ndarray) -> np.ndarray:
+    return d * (d + 1) // 2
+
+
+def total_cost(positions: np.ndarray, counts: np.ndarray, cost: Callable, t: int):
+    return (counts * cost(np.abs(positions - t))).sum()
+
+
+def convex_search(positions: np.ndarray, counts: np.ndarray, cost: Callable, lo: int, hi: int):
+    # Binary search on the sign of f(t + 1) - f(t); O(log range) evaluations
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if total_cost(positions, counts, cost, mid) <= total_cost(positions, counts, cost, mid + 1):
+            hi = mid
+        else:
+            lo = mid + 1
+    return total_cost(positions, counts, cost, lo)
+
+
+def chunked_search(positions: np.ndarray, counts: np.ndarray, cost: Callable, lo: int, hi: int, chunk_size: int):
+    # Evaluate every target with (targets, positions) distance matrices of about chunk_size elements
+    best = None
+    targets = max(1, chunk_size // len(positions))
+    for start in range(lo, hi + 1, targets):
+        t = np.arange(start, min(start + targets, hi + 1))
+        costs = cost(np.abs(positions[None, :] - t[:, None])) @ counts
+        if best is None or costs.min() < best:
+            best = costs.min()
+    return best
+
+
+def min_cost_model(positions: List[int], cost: Callable = linear, convex: bool = False, chunk_size: int = 1 << 22):
+    # Minimal total fuel for any vectorized cost(distance) model.
+    # Convex, non-decreasing models are searched in O(log range) evaluations.
+    if cost is linear or cost is triangular:
+        return min_cost(positions, triangular=cost is triangular)
+    hist = histogram(positions)
+    positions = np.flatnonzero(hist)
+    counts = hist[positions]
+    lo, hi = 0, len(hist) - 1
+    # exact Python ints once the totals may leave int64
+    bound = int(counts.sum()) * abs(int(cost(np.array([hi], dtype=object))[0]))
+    if int_dtype(bound) is object:
+        positions, counts = positions.astype(object), counts.astype(object)
+    if convex:
+        res = convex_search(positions, counts, cost, lo, hi)
+    else:
+        res = chunked_search(positions, counts, cost, lo, hi, chunk_size)
+    return res.item() if isinstance(res, np.generic) else res
+
+
 def main_part1(positions: List[int]) -> int:
-    p = np.asarray(positions)
-    m = np.max(p) + 1
-    costs = np.zeros(m)
-    for i in range(m):
-        costs[i] = np.abs(p - i).sum()
-    return np.min(costs)
+    return min_cost_model(positions, linear)
 
 
 def test_part1(sample):
@@ -27,19 +131,53 @@ def test_part1(sample):
 
 
 def main_part2(positions: List[int]) -> int:
-    p = np.asarray(positions)
-    m = np.max(p) + 1
-    costs = np.zeros(m)
-    for i in range(m):
-        steps = np.abs(p - i)
-        costs[i] = np.sum(steps * (steps + 1) / 2)
-    return np.min(costs)
+    return min_cost_model(positions, triangular)
 
 
 def test_part2(sample):
     assert main_part2(sample) == 168
 
 
+def test_min_cost(sample):
+    assert min_cost(sample, shortcut=True) == 37
+    assert min_cost(sample, triangular=True, shortcut=True) == 168
+
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        positions = rng.integers(0, 100, rng.integers(1, 50)).tolist()
+        p = np.asarray(positions)
+        expected_linear = min(np.abs(p - i).sum() for i in range(p.max() + 1))
+        expected_triangular = min((np.abs(p - i) * (np.abs(p - i) + 1) // 2).sum() for i in range(p.max() + 1))
+        assert min_cost(positions) == min_cost(positions, shortcut=True) == expected_linear
+        assert min_cost(positions, True) == min_cost(positions, True, shortcut=True) == expected_triangular
+
+
+def test_min_cost_model(sample):
+    def quadratic(d):
+        return d * d
+
+    def cubic(d):
+        return d ** 3
+
+    def step(d):
+        return (d > 3).astype(np.int64)
+
+    for cost in (quadratic, cubic, step, lambda d: d * (d + 1) // 2):
+        p = np.asarray(sample)
+        expected = min(cost(np.abs(p - t)).sum() for t in range(p.max() + 1))
+        assert min_cost_model(sample, cost, chunk_size=3) == expected
+        assert min_cost_model(sample, cost, chunk_size=13) == expected
+        if cost is not step:
+            assert min_cost_model(sample, cost, convex=True) == expected
+
+    def cubic_int(d):
+        return d ** 3
+
+    far = [0] * 100 + [10 ** 6] * 100
+    assert min_cost_model(far, cubic_int, convex=True) == 25 * 10 ** 18
+    assert min_cost_model([0, 10 ** 5], lambda d: d ** 4) == 2 * (5 * 10 ** 4) ** 4
+
+
 if __name__ == "__main__":
     input_data = read('input')
     print(main_part1(input_data))
@@ -1,5 +1,38 @@
 from pytest import fixture
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+import numpy as np
+
+SEGMENTS = {
+    '0': 'abcefg',
+    '1': 'cf',
+    '2': 'acdeg',
+    '3': 'acdfg',
+    '4': 'bcdf',
+    '5': 'abdfg',
+    '6': 'abdefg',
+    '7': 'acf',
+    '8': 'abcdefg',
+    '9': 'abcdfg',
+}
+
+
+def signature_table() -> Dict[int, str]:
+    # Every segment keeps how many of the ten digits use it under any wiring,
+    # so the sum of those frequencies over a digit's segments identifies the digit.
+    frequency = Counter(''.join(SEGMENTS.values()))
+    table = {
+        sum(frequency[s] for s in segments): digit
+        for digit, segments in SEGMENTS.items()
+    }
+    assert len(table) == len(SEGMENTS)
+    return table
+
+
+SIGNATURES = signature_table()
 
 
 @fixture
@@ -100,6 +133,82 @@ def test_part2(sample):
     assert main_part2(sample) == 61229
 
 
+def decode_fast(entry: str) -> int:
+    # O(1) dictionary lookups per digit, no search over the patterns
+    patterns, digits = entry.split(' | ')
+    frequency = Counter(patterns.replace(' ', ''))
+    return int(''.join(
+        SIGNATURES[sum(frequency[s] for s in digit)]
+        for digit in digits.split()
+    ))
+
+
+def main_part2_fast(observations: List[str]) -> int:
+    return sum(map(decode_fast, observations))
+
+
+def test_part2_fast(sample):
+    assert main_part2_fast(sample) == 61229
+
+
+def decode_chunk(entries: List[str]) -> np.ndarray:
+    # four digit outputs always fit into uint16
+    return np.fromiter(map(decode_fast, entries), dtype=np.uint16, count=len(entries))
+
+
+def chunked(lines: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    lines = iter(lines)
+    while True:
+        chunk = [line.rstrip('\n') for line in islice(lines, chunk_size)]
+        if not chunk:
+            return
+        yield chunk
+
+
+def decode_batch(
+        lines: Iterable[str], workers: int = None, chunk_size: int = 1 << 16, keep_values: bool = False
+) -> Tuple[int, Optional[np.ndarray]]:
+    # Decode chunks in a process pool, in input order, with at most 2 * workers chunks in flight.
+    # Returns the sum and, if requested, the decoded value of every line.
+    workers = workers or os.cpu_count()
+    total = 0
+    values = []
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+
+        def collect():
+            decoded = pending.popleft().result()
+            if keep_values:
+                values.append(decoded)
+            return int(decoded.sum(dtype=np.int64))
+
+        for chunk in chunked(lines, chunk_size):
+            pending.append(executor.submit(decode_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                total += collect()
+        while pending:
+            total += collect()
+    if not keep_values:
+        return total, None
+    return total, np.concatenate(values) if values else np.zeros(0, dtype=np.uint16)
+
+
+def main_part2_batch(filename: str, workers: int = None, keep_values: bool = False):
+    with open(filename, 'r') as f:
+        return decode_batch(f, workers, keep_values=keep_values)
+
+
+def test_decode_batch(sample, tmp_path):
+    total, values = decode_batch(sample * 10, workers=2, chunk_size=7, keep_values=True)
+    assert total == main_part2(sample * 10)
+    assert values.tolist() == [main_part2([entry]) for entry in sample * 10]
+    assert decode_batch(sample, workers=2) == (61229, None)
+
+    filename = tmp_path / 'input'
+    filename.write_text('\n'.join(sample) + '\n')
+    assert main_part2_batch(str(filename), workers=2) == (61229, None)
+
+
 if __name__ == "__main__":
     input_data = read('input')
     print(main_part1(input_data))
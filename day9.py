@@ -1,6 +1,8 @@
 from pytest import fixture
-from typing import List
+from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+from scipy import ndimage
 
 
 @fixture
@@ -19,48 +21,152 @@ def read(filename: str) -> List[str]:
         return f.read().splitlines()
 
 
-def main_part1(heightmap: List[str]) -> int:
-    heightmap = np.asarray([list(map(int, line)) for line in heightmap])
+def parse(heightmap: List[str]) -> np.ndarray:
+    return np.frombuffer(''.join(heightmap).encode(), dtype=np.uint8).reshape(len(heightmap), -1) - ord('0')
+
+
+def low_points(heightmap: np.ndarray) -> np.ndarray:
     mask = np.ones_like(heightmap, dtype=bool)
     mask[1:, :] &= heightmap[1:, :] < heightmap[:-1, :]
     mask[:-1, :] &= heightmap[:-1, :] < heightmap[1:, :]
     mask[:, 1:] &= heightmap[:, 1:] < heightmap[:, :-1]
     mask[:, :-1] &= heightmap[:, :-1] < heightmap[:, 1:]
+    return mask
+
 
-    return (heightmap[mask] + 1).sum()
+def main_part1(heightmap: List[str]) -> int:
+    heightmap = parse(heightmap)
+    return int((heightmap[low_points(heightmap)] + 1).sum(dtype=np.int64))
 
 
 def test_part1(sample):
     assert main_part1(sample) == 15
 
 
-def main_part2(heightmap: List[str]) -> int:
-    heightmap = np.asarray([list(map(int, line)) for line in heightmap])
-    mask = np.ones_like(heightmap, dtype=bool)
-    mask[1:, :] &= heightmap[1:, :] < heightmap[:-1, :]
-    mask[:-1, :] &= heightmap[:-1, :] < heightmap[1:, :]
-    mask[:, 1:] &= heightmap[:, 1:] < heightmap[:, :-1]
-    mask[:, :-1] &= heightmap[:, :-1] < heightmap[:, 1:]
-
-    basinmap = np.zeros_like(heightmap)
-    basinmap[mask] = np.arange(1, np.count_nonzero(mask) + 1)
+def basin_sizes(heightmap: np.ndarray, seeded: bool = False) -> np.ndarray:
+    # Basins are the 4-connected components of the non-9 cells, labelled in a single pass.
+    # With seeded=True only basins that contain a low point are kept.
+    labels, count = ndimage.label(heightmap != 9)
+    sizes = np.bincount(labels.ravel(), minlength=count + 1)[1:]
+    if seeded:
+        seeds = np.unique(labels[low_points(heightmap)])
+        sizes = sizes[seeds[seeds > 0] - 1]
+    return sizes
 
-    mask = heightmap != 9
-    while np.any(basinmap[mask] == 0):
-        basinmap[1:, :] |= mask[1:, :] * basinmap[:-1, :]
-        basinmap[:-1, :] |= mask[:-1, :] * basinmap[1:, :]
-        basinmap[:, 1:] |= mask[:, 1:] * basinmap[:, :-1]
-        basinmap[:, :-1] |= mask[:, :-1] * basinmap[:, 1:]
 
-    unique, cnt = np.unique(basinmap, return_counts=True)
-    cnt = np.sort(cnt[1:])
-    return np.prod(cnt[-3:])
+def main_part2(heightmap: List[str]) -> int:
+    sizes = np.sort(basin_sizes(parse(heightmap)))
+    return int(np.prod(sizes[-3:], dtype=np.int64))
 
 
 def test_part2(sample):
     assert main_part2(sample) == 1134
 
 
+def test_basin_sizes(sample):
+    heightmap = parse(sample)
+    assert sorted(basin_sizes(heightmap, seeded=True)) == [3, 9, 9, 14]
+    assert sorted(basin_sizes(heightmap)) == [3, 9, 9, 14]
+
+
+def read_mmap(filename: str) -> np.ndarray:
+    # (rows, columns) uint8 view of the digit characters, nothing is loaded into memory
+    data = np.memmap(filename, dtype=np.uint8, mode='r')
+    width = int(np.argmax(data[:1 << 20] == ord('\n')))
+    height = (data.size + 1) // (width + 1)
+    return np.lib.stride_tricks.as_strided(data, shape=(height, width), strides=(width + 1, 1), writeable=False)
+
+
+def tiles(shape: Tuple[int, int], tile: int) -> List[Tuple[slice, slice]]:
+    return [
+        (slice(i, min(i + tile, shape[0])), slice(j, min(j + tile, shape[1])))
+        for i in range(0, shape[0], tile)
+        for j in range(0, shape[1], tile)
+    ]
+
+
+def tile_risk(chars: np.ndarray, rows: slice, columns: slice) -> int:
+    # low points of the tile, computed with a one cell halo
+    top, left = max(rows.start - 1, 0), max(columns.start - 1, 0)
+    heightmap = chars[top:rows.stop + 1, left:columns.stop + 1] - ord('0')
+    inner = (slice(rows.start - top, rows.stop - top), slice(columns.start - left, columns.stop - left))
+    return int((heightmap[inner][low_points(heightmap)[inner]] + 1).sum(dtype=np.int64))
+
+
+def main_part1_tiled(filename: str, tile: int = 1024, workers: int = None) -> int:
+    chars = read_mmap(filename)
+    with ThreadPoolExecutor(workers) as executor:
+        return sum(executor.map(lambda t: tile_risk(chars, *t), tiles(chars.shape, tile)))
+
+
+def tile_basins(chars: np.ndarray, rows: slice, columns: slice) -> Tuple[np.ndarray, ...]:
+    # Local labels of the top, bottom, left and right border strips and the size of
+    # every local basin; the full label array of the tile is dropped.
+    labels, count = ndimage.label(chars[rows, columns] != ord('9'))
+    sizes = np.bincount(labels.ravel(), minlength=count + 1)[1:]
+    return labels[0].copy(), labels[-1].copy(), labels[:, 0].copy(), labels[:, -1].copy(), sizes
+
+
+def find(parent: np.ndarray, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def main_part2_tiled(filename: str, tile: int = 1024, workers: int = None) -> int:
+    # Label every tile independently, then merge labels that touch across tile borders.
+    chars = read_mmap(filename)
+    grid = tiles(chars.shape, tile)
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(executor.map(lambda t: tile_basins(chars, *t), grid))
+
+    offsets = np.cumsum([0] + [len(result[-1]) for result in results])
+    sizes = np.concatenate([result[-1] for result in results] + [np.zeros(0, dtype=np.int64)])
+    index = {(t[0].start, t[1].start): k for k, t in enumerate(grid)}
+
+    def border(k, side):
+        strip = results[k][('top', 'bottom', 'left', 'right').index(side)]
+        return np.where(strip > 0, strip + offsets[k] - 1, -1)
+
+    pairs = []
+    for k, (rows, columns) in enumerate(grid):
+        for other, side, other_side in (
+                ((rows.stop, columns.start), 'bottom', 'top'),
+                ((rows.start, columns.stop), 'right', 'left'),
+        ):
+            if other in index:
+                a, b = border(k, side), border(index[other], other_side)
+                connected = (a >= 0) & (b >= 0)
+                pairs.append(np.stack([a[connected], b[connected]], axis=1))
+
+    parent = np.arange(len(sizes))
+    for a, b in np.unique(np.concatenate(pairs + [np.zeros((0, 2), dtype=np.int64)]), axis=0).tolist():
+        a, b = find(parent, a), find(parent, b)
+        if a != b:
+            parent[b] = a
+    roots = np.array([find(parent, i) for i in range(len(sizes))], dtype=np.int64)
+    basins = np.bincount(roots, weights=sizes, minlength=len(sizes)).astype(np.int64)
+    basins = np.sort(basins[basins > 0])
+    return int(np.prod(basins[-3:], dtype=np.int64))
+
+
+def test_tiled(sample, tmp_path):
+    filename = tmp_path / 'input'
+    filename.write_text('\n'.join(sample))
+    for tile in (1, 2, 3, 4, 100):
+        assert main_part1_tiled(str(filename), tile, workers=2) == main_part1(sample)
+        assert main_part2_tiled(str(filename), tile, workers=2) == main_part2(sample)
+
+    rng = np.random.default_rng(0)
+    heights = np.where(rng.random((37, 23)) < 0.4, 9, rng.integers(0, 9, (37, 23)))
+    heightmap = [''.join(map(str, row)) for row in heights]
+    filename.write_text('\n'.join(heightmap) + '\n')
+    for tile in (4, 7):
+        assert main_part1_tiled(str(filename), tile) == main_part1(heightmap)
+        assert main_part2_tiled(str(filename), tile) == main_part2(heightmap)
+
+
 if __name__ == "__main__":
     input_data = read('input')
     print(main_part1(input_data))